@@ -20,41 +20,64 @@ Copyright (C) 2018–2020  each contribution's author
 SPDX-License-Identifier: GPL-3.0-or-later
 """
 
-import liquidctl.driver.asetek
-import liquidctl.driver.coolit_platinum
-import liquidctl.driver.corsair_hid_psu
-import liquidctl.driver.kraken_two
-import liquidctl.driver.kraken_gen4
-import liquidctl.driver.nzxt_smart_device
-import liquidctl.driver.seasonic
+import importlib
+import itertools
+import sys
 
-from liquidctl.driver.base import BaseBus, find_all_subclasses
+from liquidctl.driver.base import BaseBus, find_sorted_subclasses
+
+# built-in driver modules; these are only imported when first needed
+_DRIVER_MODULES = [
+    'asetek',
+    'coolit_platinum',
+    'corsair_hid_psu',
+    'kraken_two',
+    'kraken_gen4',
+    'nzxt_smart_device',
+    'seasonic',
+]
+
+
+def __getattr__(name):
+    """Import built-in driver modules on first access (Python 3.7+)."""
+    if name in _DRIVER_MODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _load_drivers():
+    for name in _DRIVER_MODULES:
+        importlib.import_module(f'{__name__}.{name}')
+
+
+# module __getattr__ (PEP 562) is ignored before Python 3.7, so load the
+# drivers eagerly to keep liquidctl.driver.<module> accessible
+if sys.version_info < (3, 7):
+    _load_drivers()
 
 
 def find_liquidctl_devices(pick=None, **kwargs):
     """Find devices and instantiate corresponding liquidctl drivers.
 
-    Probes all buses and drivers that have been loaded at the time of the call
-    and yields driver instances.
+    Loads all built-in drivers, probes all buses and drivers that have been
+    loaded at the time of the call and yields driver instances.
 
     Filter conditions can be passed through to the buses and drivers via
     `**kwargs`.  A driver instance will be yielded for each compatible device
     that matches the supplied filter conditions.
 
     If `pick` is passed, only the driver instance for the `(pick + 1)`-th
-    matched device will be yielded.
+    matched device will be yielded; nothing is yielded for negative values.
     """
-    buses = sorted(find_all_subclasses(BaseBus), key=lambda x: x.__name__)
-    num = 0
-    for bus_cls in buses:
-        for dev in  bus_cls().find_devices(**kwargs):
-            if pick is not None:
-                if num == pick:
-                    yield dev
-                    return
-                num += 1
-            else:
-                yield dev
+    if pick is not None and pick < 0:
+        return
+    _load_drivers()
+    buses = find_sorted_subclasses(BaseBus)
+    devs = (dev for bus_cls in buses for dev in bus_cls().find_devices(**kwargs))
+    if pick is not None:
+        yield from itertools.islice(devs, pick, pick + 1)
+    else:
+        yield from devs
 
 
 __all__ = [
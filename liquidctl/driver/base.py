@@ -6,6 +6,11 @@ Copyright (C) 2018–2019  each contribution's author
 SPDX-License-Identifier: GPL-3.0-or-later
 """
 
+import functools
+
+from operator import attrgetter
+
+
 class BaseDriver:
     """Base driver API.
 
@@ -25,6 +30,10 @@ class BaseDriver:
 
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        find_sorted_subclasses.cache_clear()
+
     @classmethod
     def find_supported_devices(cls, **kwargs):
         """Find and bind to compatible devices.
@@ -136,15 +145,42 @@ class BaseDriver:
 class BaseBus:
     """Base bus API."""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        find_sorted_subclasses.cache_clear()
+
     def find_devices(self, **kwargs):
         """Find compatible devices and yield corresponding driver instances."""
         return
 
+    def find_devices_for(self, driver, **kwargs):
+        """Find devices compatible with `driver` and yield its instances.
+
+        Buses should override this to only probe `driver`.
+        """
+        return (dev for dev in self.find_devices(**kwargs) if type(dev) == driver)
+
 
 def find_all_subclasses(cls):
     """Recursively find loaded subclasses of `cls`.
 
     Returns a set of subclasses of `cls`.
     """
-    sub = set(cls.__subclasses__())
-    return sub.union([s for c in cls.__subclasses__() for s in find_all_subclasses(c)])
+    found = set()
+    pending = cls.__subclasses__()
+    while pending:
+        sub = pending.pop()
+        if sub not in found:
+            found.add(sub)
+            pending.extend(sub.__subclasses__())
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def find_sorted_subclasses(cls):
+    """Find loaded subclasses of `cls`, sorted by name.
+
+    Returns a tuple of subclasses of `cls`.  Results are cached, and the cache
+    is cleared whenever a new bus or driver is defined.
+    """
+    return tuple(sorted(find_all_subclasses(cls), key=attrgetter('__name__')))
@@ -24,12 +24,15 @@ Copyright (C) 2020–2020  each contribution's author
 SPDX-License-Identifier: GPL-3.0-or-later
 """
 
+import functools
 import itertools
 import logging
+import queue
+import threading
 
 from enum import Enum, unique
 
-from liquidctl.driver.usb import UsbHidDriver
+from liquidctl.driver.usb import STATUS_TTL, UsbHidDriver
 from liquidctl.keyval import RuntimeStorage
 from liquidctl.pmbus import compute_pec
 from liquidctl.util import clamp, fraction_of_byte, u16le_from, normalize_profile
@@ -58,6 +61,12 @@ _FAN_OFFSETS = list(zip(_FAN_MODE_OFFSETS, _FAN_DUTY_OFFSETS, _FAN_PROFILE_OFFSE
 _PUMP_MODE_OFFSET = 0x17 - 3
 _PROFILE_LENGTH_OFFSET = 0x1D - 3
 _PROFILE_LENGTH = 7
+_SET_COOLING_TEMPLATE = bytes(
+    _SET_COOLING_DATA_PREFIX
+    + [0x0] * (_PROFILE_LENGTH_OFFSET - len(_SET_COOLING_DATA_PREFIX))
+    + [_PROFILE_LENGTH]
+    + [0x0] * (_SET_COOLING_DATA_LENGTH - _PROFILE_LENGTH_OFFSET - 1)
+)
 _CRITICAL_TEMPERATURE = 60
 
 
@@ -94,11 +103,17 @@ def _sequence(storage):
 
     In the protocol the sequence number is usually shifted left by 3 bits, and
     a shifted sequence will look like: 8, 16, 24... 232, 240, 248, 8, 16, 24...
+
+    The last sequence number is only loaded from `storage` on the first
+    iteration, and only stored back when the generator is closed.
     """
-    while True:
-        seq = storage.load('sequence', of_type=int, default=0) % 31 + 1
+    seq = storage.load('sequence', of_type=int, default=0)
+    try:
+        while True:
+            seq = seq % 31 + 1
+            yield seq
+    finally:
         storage.store('sequence', seq)
-        yield seq
 
 
 def _prepare_profile(original):
@@ -112,6 +127,29 @@ def _prepare_profile(original):
     return normal
 
 
+@functools.lru_cache(maxsize=32)
+def _encode_profile(profile):
+    """Prepare and encode a profile given as a tuple of (temp, duty) tuples.
+
+    Returns the prepared profile, as a tuple, and its encoded (temp, duty
+    byte) pairs.  Results are cached, since the same profiles are usually sent
+    again every time any cooling setting changes.
+    """
+    prepared = tuple(_prepare_profile(profile))
+    pairs = ((temp, fraction_of_byte(percentage=duty)) for temp, duty in prepared)
+    return prepared, bytes(itertools.chain(*pairs))
+
+
+def _bgr_bytes(colors):
+    """Encode `[red, green, blue]` colors as consecutive blue, green, red bytes."""
+    rgb = bytes(itertools.chain.from_iterable(colors))
+    bgr = bytearray(len(rgb))
+    bgr[0::3] = rgb[2::3]
+    bgr[1::3] = rgb[1::3]
+    bgr[2::3] = rgb[0::3]
+    return bytes(bgr)
+
+
 def _quoted(*names):
     return ', '.join(map(repr, names))
 
@@ -134,7 +172,8 @@ class CoolitPlatinumDriver(UsbHidDriver):
             {'fan_count': 1, 'rgb_fans': False}),
     ]
 
-    def __init__(self, device, description, fan_count, rgb_fans, **kwargs):
+    def __init__(self, device, description, fan_count, rgb_fans, status_ttl=STATUS_TTL,
+                 **kwargs):
         super().__init__(device, description, **kwargs)
         self._component_count = 1 + fan_count * rgb_fans
         self._fan_names = [f'fan{i + 1}' for i in range(fan_count)]
@@ -145,9 +184,14 @@ class CoolitPlatinumDriver(UsbHidDriver):
             ('sync', 'super-fixed'): 8,
             ('sync', 'off'): 0,
         }
+        self._init_status_cache(status_ttl)
         # the following fields are only initialized in connect()
         self._data = None
         self._sequence = None
+        self._pending = None
+        self._writer = None
+        self._write_buf = None
+        self._cooling_buf = None
 
     def connect(self, **kwargs):
         """Connect to the device."""
@@ -155,6 +199,32 @@ class CoolitPlatinumDriver(UsbHidDriver):
         ids = f'{self.vendor_id:04x}_{self.product_id:04x}'
         self._data = RuntimeStorage(key_prefixes=[ids, self.address])
         self._sequence = _sequence(self._data)
+        self._pending = queue.Queue()
+        # self.device.write expects buf[0] to be the report number or 0 if not used
+        self._write_buf = bytearray(_REPORT_LENGTH + 1)
+        self._cooling_buf = bytearray(_SET_COOLING_DATA_LENGTH)
+
+    def disconnect(self, **kwargs):
+        """Disconnect from the device.
+
+        Commands still pending from non-blocking calls are sent first.
+        """
+        if self._writer:
+            self._pending.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._sequence:
+            self._sequence.close()
+        super().disconnect(**kwargs)
+
+    def flush(self):
+        """Wait until all commands from non-blocking calls have been sent.
+
+        Errors from non-blocking calls are not raised here: they are only
+        logged when the background writer fails to send the command.
+        """
+        if self._pending:
+            self._pending.join()
 
     def initialize(self, pump_mode='balanced', **kwargs):
         """Initialize the device and set the pump mode.
@@ -178,7 +248,12 @@ class CoolitPlatinumDriver(UsbHidDriver):
 
         Returns a list of `(property, value, unit)` tuples.
         """
-        res = self._send_command(_FEATURE_COOLING, _CMD_GET_STATUS)
+        cached = self._cached_status()
+        if cached is not None:
+            return cached
+        self.flush()
+        with self._session():
+            res = self._send_command(_FEATURE_COOLING, _CMD_GET_STATUS)
         status = [
             ('Liquid temperature', res[8] + res[7] / 255, '°C'),
             ('Pump speed', u16le_from(res, offset=29), 'rpm'),
@@ -194,9 +269,9 @@ class CoolitPlatinumDriver(UsbHidDriver):
             )
         else:
             assert False, f'unxpected {len(self._fan_names)} fans to parse'
-        return status
+        return self._cache_status(status)
 
-    def set_fixed_speed(self, channel, duty, **kwargs):
+    def set_fixed_speed(self, channel, duty, blocking=True, **kwargs):
         """Set fan or fans to a fixed speed duty.
 
         Coolers with two fans allow each to be controlled individually.  Valid
@@ -207,13 +282,19 @@ class CoolitPlatinumDriver(UsbHidDriver):
         The H150i PRO XT differs from this scheme and only has a single fan
         channel.  Thus it is more sensible to use 'fan', even though 'fan1' is
         accepted as well.
+
+        If `blocking` is false the command is sent to the device in the
+        background, and the call returns without waiting for the device to
+        reply; use `flush()` or `disconnect()` to wait for it to complete.
+        Errors in sending a non-blocking command never reach the caller, and
+        only appear in the log.
         """
         for hw_channel in self._get_hw_fan_channels(channel):
             self._data.store(f'{hw_channel}_mode', _FanMode.FIXED_DUTY.value)
             self._data.store(f'{hw_channel}_duty', duty)
-        self._send_set_cooling()
+        self._send_set_cooling(blocking=blocking)
 
-    def set_speed_profile(self, channel, profile, **kwargs):
+    def set_speed_profile(self, channel, profile, blocking=True, **kwargs):
         """Set fan or fans to follow a speed duty profile.
 
         Coolers with two fans allow each to be controlled individually.  Valid
@@ -229,12 +310,15 @@ class CoolitPlatinumDriver(UsbHidDriver):
         with temperatures in Celsius and duty values in percentage.  The last
         point should set the fan to 100% duty cycle, or be omitted; in the
         latter case the fan will be set to max out at 60°C.
+
+        If `blocking` is false the command is sent to the device in the
+        background (see `set_fixed_speed`); errors are then only logged.
         """
         profile = list(profile)
         for hw_channel in self._get_hw_fan_channels(channel):
             self._data.store(f'{hw_channel}_mode', _FanMode.CUSTOM_PROFILE.value)
             self._data.store(f'{hw_channel}_profile', profile)
-        self._send_set_cooling()
+        self._send_set_cooling(blocking=blocking)
 
     def set_color(self, channel, mode, colors, **kwargs):
         """Set the color of each LED.
@@ -275,20 +359,22 @@ class CoolitPlatinumDriver(UsbHidDriver):
         """
         channel, mode, colors = channel.lower(), mode.lower(), list(colors)
         maxcolors = self._check_color_args(channel, mode, colors)
+        self.flush()
         if mode == 'off':
-            expanded = []
+            expanded = b''
         elif (channel, mode) == ('led', 'super-fixed'):
-            expanded = colors[:maxcolors]
+            expanded = _bgr_bytes(colors[:maxcolors])
         elif (channel, mode) == ('sync', 'fixed'):
-            expanded = list(itertools.chain(*([color] * 8 for color in colors[:maxcolors])))
+            expanded = b''.join(_bgr_bytes([color]) * 8 for color in colors[:maxcolors])
         elif (channel, mode) == ('sync', 'super-fixed'):
-            expanded = (colors[:8] + [[0, 0, 0]] * (8 - len(colors))) * self._component_count
+            expanded = _bgr_bytes(colors[:8]).ljust(8 * 3, b'\x00') * self._component_count
         else:
             assert False, 'assumed unreacheable'
-        data1 = bytes(itertools.chain(*((b, g, r) for r, g, b in expanded[0:20])))
-        data2 = bytes(itertools.chain(*((b, g, r) for r, g, b in expanded[20:])))
-        self._send_command(_FEATURE_LIGHTING, _CMD_SET_LIGHTING1, data=data1)
-        self._send_command(_FEATURE_LIGHTING, _CMD_SET_LIGHTING2, data=data2)
+        data1 = expanded[:20 * 3]
+        data2 = expanded[20 * 3:]
+        with self._session():
+            self._send_command(_FEATURE_LIGHTING, _CMD_SET_LIGHTING1, data=data1)
+            self._send_command(_FEATURE_LIGHTING, _CMD_SET_LIGHTING2, data=data2)
 
     def _check_color_args(self, channel, mode, colors):
         maxcolors = self._maxcolors.get((channel, mode))
@@ -307,8 +393,7 @@ class CoolitPlatinumDriver(UsbHidDriver):
         raise ValueError(f'Unknown channel, should be one of: {_quoted("fan", *self._fan_names)}')
 
     def _send_command(self, feature, command, data=None):
-        # self.device.write expects buf[0] to be the report number or 0 if not used
-        buf = bytearray(_REPORT_LENGTH + 1)
+        buf = self._write_buf
         buf[1] = _WRITE_PREFIX
         buf[2] = next(self._sequence) << 3
         if feature is not None:
@@ -318,25 +403,39 @@ class CoolitPlatinumDriver(UsbHidDriver):
         else:
             buf[2] |= command
             start_at = 3
+        end = start_at
         if data:
             assert len(data) <= _REPORT_LENGTH - start_at, 'data does not fit'
-            buf[start_at : start_at + len(data)] = data
-        buf[-1] = compute_pec(buf[2:-1])
-        LOGGER.debug('write %s', buf.hex())
-        self.device.clear_enqueued_reports()
+            end += len(data)
+            buf[start_at : end] = data
+        self._pad_with_zeroes(buf, end, -1)
+        buf[-1] = compute_pec(memoryview(buf)[2:-1])
         self.device.write(buf)
-        buf = bytes(self.device.read(_REPORT_LENGTH))
-        self.device.release()
-        LOGGER.debug('received %s', buf.hex())
-        if compute_pec(buf[1:]):
+        reply = bytes(self.device.read(_REPORT_LENGTH))
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('write %s, received %s', buf.hex(), reply.hex())
+        if compute_pec(memoryview(reply)[1:]):
             LOGGER.warning('response checksum does not match data')
-        return buf
-
-    def _send_set_cooling(self):
+        return reply
+
+    def _write_pending(self):
+        while True:
+            data = self._pending.get()
+            try:
+                if data is None:
+                    return
+                with self._session():
+                    self._send_command(_FEATURE_COOLING, _CMD_SET_COOLING, data=data)
+            except Exception:
+                LOGGER.exception('failed to send pending cooling command')
+            finally:
+                self._pending.task_done()
+
+    def _send_set_cooling(self, blocking=True):
         assert len(self._fan_names) <= 2, 'fans would overwrite pump_mode'
-        data = bytearray(_SET_COOLING_DATA_LENGTH)
-        data[0 : len(_SET_COOLING_DATA_PREFIX)] = _SET_COOLING_DATA_PREFIX
-        data[_PROFILE_LENGTH_OFFSET] = _PROFILE_LENGTH
+        self._invalidate_status()
+        data = self._cooling_buf
+        data[:] = _SET_COOLING_TEMPLATE
         for fan, (imode, iduty, iprofile) in zip(self._fan_names, _FAN_OFFSETS):
             mode = _FanMode(self._data.load(f'{fan}_mode', of_type=int))
             if mode is _FanMode.FIXED_DUTY:
@@ -346,9 +445,9 @@ class CoolitPlatinumDriver(UsbHidDriver):
                 LOGGER.info('setting %s to %d%% duty cycle', fan, duty)
             elif mode is _FanMode.CUSTOM_PROFILE:
                 stored = self._data.load(f'{fan}_profile', of_type=list, default=[])
-                profile = _prepare_profile(stored)  # ensures correct len(profile)
-                pairs = ((temp, fraction_of_byte(percentage=duty)) for temp, duty in profile)
-                data[iprofile : iprofile + _PROFILE_LENGTH * 2] = itertools.chain(*pairs)
+                # ensures correct len(profile)
+                profile, encoded = _encode_profile(tuple(map(tuple, stored)))
+                data[iprofile : iprofile + _PROFILE_LENGTH * 2] = encoded
                 LOGGER.info('setting %s to follow profile %r', fan, profile)
             else:
                 raise ValueError(f'Unsupported fan {mode}')
@@ -356,4 +455,12 @@ class CoolitPlatinumDriver(UsbHidDriver):
         pump_mode = _PumpMode(self._data.load('pump_mode', of_type=int))
         data[_PUMP_MODE_OFFSET] = pump_mode.value
         LOGGER.info('setting pump mode to %s', pump_mode.name.lower())
-        return self._send_command(_FEATURE_COOLING, _CMD_SET_COOLING, data=data)
+        if not blocking:
+            if not self._writer:
+                self._writer = threading.Thread(target=self._write_pending, daemon=True)
+                self._writer.start()
+            self._pending.put(bytes(data))
+            return None
+        self.flush()
+        with self._session():
+            return self._send_command(_FEATURE_COOLING, _CMD_SET_COOLING, data=data)
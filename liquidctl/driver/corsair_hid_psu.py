@@ -31,7 +31,7 @@ import logging
 from datetime import timedelta
 from enum import Enum
 
-from liquidctl.driver.usb import UsbHidDriver
+from liquidctl.driver.usb import STATUS_TTL, UsbHidDriver
 from liquidctl.pmbus import CommandCode as CMD
 from liquidctl.pmbus import WriteBit, linear_to_float
 from liquidctl.util import clamp
@@ -50,7 +50,7 @@ _CORSAIR_FAN_CONTROL_MODE = CMD.MFR_SPECIFIC_F0
 _RAIL_12V = 0x0
 _RAIL_5V = 0x1
 _RAIL_3P3V = 0x2
-_RAIL_NAMES = {_RAIL_12V : '+12V', _RAIL_5V : '+5V', _RAIL_3P3V : '+3.3V'}
+_RAILS = ((_RAIL_12V, '+12V'), (_RAIL_5V, '+5V'), (_RAIL_3P3V, '+3.3V'))
 _MIN_FAN_DUTY = 0
 
 
@@ -87,6 +87,11 @@ class CorsairHidPsuDriver(UsbHidDriver):
         (0x1b1c, 0x1c0d, None, 'Corsair RM1000i (experimental)', {}),
     ]
 
+    def __init__(self, device, description, status_ttl=STATUS_TTL, **kwargs):
+        super().__init__(device, description, **kwargs)
+        self._init_status_cache(status_ttl)
+        self._write_buf = bytearray(_WRITE_LENGTH)
+
     def initialize(self, single_12v_ocp=False, **kwargs):
         """Initialize the device.
 
@@ -95,91 +100,152 @@ class CorsairHidPsuDriver(UsbHidDriver):
         Note: replies before calling this function appear to follow the
         pattern <address> <cte 0xfe> <zero> <zero> <padding...>.
         """
-        self.device.clear_enqueued_reports()
-        self._write([0xfe, 0x03])  # not well understood
-        self._read()
-        mode = OCPMode.SINGLE_RAIL if single_12v_ocp else OCPMode.MULTI_RAIL
-        if mode != self._get_12v_ocp_mode():
-            # TODO replace log level with info once this has been confimed to work
-            LOGGER.warning('(experimental feature) changing +12V OCP mode to %s', mode)
-            self._exec(WriteBit.WRITE, _CORSAIR_12V_OCP_MODE, [mode.value])
-        if self._get_fan_control_mode() != FanControlMode.HARDWARE:
-            LOGGER.info('resetting fan control to hardware mode')
-            self._set_fan_control_mode(FanControlMode.HARDWARE)
-        self.device.release()
+        self._invalidate_status()
+        with self._session():
+            self._transfer([0xfe, 0x03])  # not well understood
+            mode = OCPMode.SINGLE_RAIL if single_12v_ocp else OCPMode.MULTI_RAIL
+            if mode != self._get_12v_ocp_mode():
+                # TODO replace log level with info once this has been confimed to work
+                LOGGER.warning('(experimental feature) changing +12V OCP mode to %s', mode)
+                self._exec(WriteBit.WRITE, _CORSAIR_12V_OCP_MODE, [mode.value])
+            if self._get_fan_control_mode() != FanControlMode.HARDWARE:
+                LOGGER.info('resetting fan control to hardware mode')
+                self._set_fan_control_mode(FanControlMode.HARDWARE)
 
     def get_status(self, **kwargs):
         """Get a status report.
 
         Returns a list of `(property, value, unit)` tuples.
         """
-        self.device.clear_enqueued_reports()
-        ret = self._exec(WriteBit.WRITE, CMD.PAGE, [0])
-        if ret[1] == 0xfe:
-            LOGGER.warning('possibly uninitialized device')
-        status = [
-            ('Current uptime', self._get_timedelta(_CORSAIR_READ_UPTIME), ''),
-            ('Total uptime', self._get_timedelta(_CORSAIR_READ_TOTAL_UPTIME), ''),
-            ('Temperature 1', self._get_float(CMD.READ_TEMPERATURE_1), '°C'),
-            ('Temperature 2', self._get_float(CMD.READ_TEMPERATURE_2), '°C'),
-            ('Fan control mode', self._get_fan_control_mode(), ''),
-            ('Fan speed', self._get_float(CMD.READ_FAN_SPEED_1), 'rpm'),
-            ('Input voltage', self._get_float(CMD.READ_VIN), 'V'),
-            ('Total power', self._get_float(_CORSAIR_READ_INPUT_POWER), 'W'),
-            ('+12V OCP mode', self._get_12v_ocp_mode(), ''),
-        ]
-        for rail in [_RAIL_12V, _RAIL_5V, _RAIL_3P3V]:
-            name = _RAIL_NAMES[rail]
-            self._exec(WriteBit.WRITE, CMD.PAGE, [rail])
-            status.append((f'{name} output voltage', self._get_float(CMD.READ_VOUT), 'V'))
-            status.append((f'{name} output current', self._get_float(CMD.READ_IOUT), 'A'))
-            status.append((f'{name} output power', self._get_float(CMD.READ_POUT), 'W'))
-        self._exec(WriteBit.WRITE, CMD.PAGE, [0])
-        self.device.release()
+        cached = self._cached_status()
+        if cached is not None:
+            return cached
+        # execute all requests back to back and only decode the replies once
+        # the device has answered all of them
+        with self._session():
+            ret = self._exec(WriteBit.WRITE, CMD.PAGE, [0])
+            if ret[1] == 0xfe:
+                LOGGER.warning('possibly uninitialized device')
+            replies = self._exec_batch(request for request, _, _, _ in _STATUS_QUEUE)
+        status = [(label, decode(reply), unit)
+                  for (_, label, decode, unit), reply in zip(_STATUS_QUEUE, replies) if label]
         LOGGER.warning('reading the +12V OCP mode is an experimental feature')
-        return status
+        return self._cache_status(status)
 
     def set_fixed_speed(self, channel, duty, **kwargs):
         """Set channel to a fixed speed duty."""
         duty = clamp(duty, _MIN_FAN_DUTY, 100)
-        LOGGER.info('ensuring fan control is in software mode')
-        self._set_fan_control_mode(FanControlMode.SOFTWARE)
-        LOGGER.info('setting fan PWM duty to %i%%', duty)
-        self._exec(WriteBit.WRITE, CMD.FAN_COMMAND_1, [duty])
-        self.device.release()
+        self._invalidate_status()
+        with self._session():
+            LOGGER.info('ensuring fan control is in software mode')
+            self._set_fan_control_mode(FanControlMode.SOFTWARE)
+            LOGGER.info('setting fan PWM duty to %i%%', duty)
+            self._exec(WriteBit.WRITE, CMD.FAN_COMMAND_1, [duty])
 
     def _write(self, data):
-        padding = [0x0]*(_WRITE_LENGTH - len(data))
-        LOGGER.debug('write %s (and %i padding bytes)',
-                     ' '.join(format(i, '02x') for i in data), len(padding))
-        self.device.write(data + padding)
+        buf = self._write_buf
+        end = len(data)
+        buf[:end] = data
+        self._pad_with_zeroes(buf, end)
+        self.device.write(buf)
 
     def _read(self):
-        msg = self.device.read(_READ_LENGTH)
-        LOGGER.debug('received %s', ' '.join(format(i, '02x') for i in msg))
+        return self.device.read(_READ_LENGTH)
+
+    def _transfer(self, data):
+        """Write `data` and read the reply, logging both in a single record."""
+        self._write(data)
+        msg = bytes(self._read())
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('write %s (and %i padding bytes), received %s',
+                         bytes(data).hex(), _WRITE_LENGTH - len(data), msg.hex())
         return msg
 
     def _exec(self, writebit, command, data=None):
-        self._write([_SLAVE_ADDRESS | WriteBit(writebit), CMD(command)] + (data or []))
-        return self._read()
+        return self._transfer([_SLAVE_ADDRESS | WriteBit(writebit), CMD(command)] + (data or []))
+
+    def _exec_batch(self, requests):
+        """Execute a sequence of `(writebit, command[, data])` requests.
+
+        Requests are executed in order, and each reply is read before the next
+        request is sent.  Returns the list of replies.
+        """
+        return [self._exec(*request) for request in requests]
 
     def _get_12v_ocp_mode(self):
         """Get +12V single/multi-rail OCP mode."""
-        return OCPMode(self._exec(WriteBit.READ, _CORSAIR_12V_OCP_MODE)[2])
+        return _decode_ocp_mode(self._exec(WriteBit.READ, _CORSAIR_12V_OCP_MODE))
 
     def _get_fan_control_mode(self):
         """Get hardware/software fan control mode."""
-        return FanControlMode(self._exec(WriteBit.READ, _CORSAIR_FAN_CONTROL_MODE)[2])
+        return _decode_fan_control_mode(self._exec(WriteBit.READ, _CORSAIR_FAN_CONTROL_MODE))
 
     def _set_fan_control_mode(self, mode):
         """Set hardware/software fan control mode."""
         return self._exec(WriteBit.WRITE, _CORSAIR_FAN_CONTROL_MODE, [mode.value])
 
-    def _get_float(self, command):
-        """Get float value with `command`."""
-        return linear_to_float(self._exec(WriteBit.READ, command)[2:])
 
-    def _get_timedelta(self, command):
-        """Get timedelta with `command`."""
-        secs = int.from_bytes(self._exec(WriteBit.READ, command)[2:], byteorder='little')
-        return timedelta(seconds=secs)
+def _decode_float(reply):
+    return linear_to_float(memoryview(reply)[2:])
+
+
+def _decode_timedelta(reply):
+    secs = int.from_bytes(memoryview(reply)[2:], byteorder='little')
+    return timedelta(seconds=secs)
+
+
+# plain dict lookups are much cheaper than calling the Enum classes
+_OCP_BY_VALUE = {m.value: m for m in OCPMode}
+_FCM_BY_VALUE = {m.value: m for m in FanControlMode}
+
+
+def _decode_ocp_mode(reply):
+    return _OCP_BY_VALUE[reply[2]]
+
+
+def _decode_fan_control_mode(reply):
+    return _FCM_BY_VALUE[reply[2]]
+
+
+# (label, command, decoder, unit) for each value read while on page 0
+_STATUS_READS = [
+    ('Current uptime', _CORSAIR_READ_UPTIME, _decode_timedelta, ''),
+    ('Total uptime', _CORSAIR_READ_TOTAL_UPTIME, _decode_timedelta, ''),
+    ('Temperature 1', CMD.READ_TEMPERATURE_1, _decode_float, '°C'),
+    ('Temperature 2', CMD.READ_TEMPERATURE_2, _decode_float, '°C'),
+    ('Fan control mode', _CORSAIR_FAN_CONTROL_MODE, _decode_fan_control_mode, ''),
+    ('Fan speed', CMD.READ_FAN_SPEED_1, _decode_float, 'rpm'),
+    ('Input voltage', CMD.READ_VIN, _decode_float, 'V'),
+    ('Total power', _CORSAIR_READ_INPUT_POWER, _decode_float, 'W'),
+    ('+12V OCP mode', _CORSAIR_12V_OCP_MODE, _decode_ocp_mode, ''),
+]
+
+# (label suffix, command, unit) for each value read from every rail's page
+_RAIL_READS = [
+    ('output voltage', CMD.READ_VOUT, 'V'),
+    ('output current', CMD.READ_IOUT, 'A'),
+    ('output power', CMD.READ_POUT, 'W'),
+]
+
+
+def _make_status_queue():
+    """Prepare the `(request, label, decoder, unit)` entries read by get_status.
+
+    Page switches have no label.  The device is expected to start on page 0,
+    so the +12V rail is read without selecting it first.
+    """
+    queue = [((WriteBit.READ, cmd), label, decode, unit)
+             for label, cmd, decode, unit in _STATUS_READS]
+    page = 0
+    for rail, name in _RAILS:
+        if rail != page:
+            queue.append(((WriteBit.WRITE, CMD.PAGE, [rail]), None, None, None))
+            page = rail
+        queue.extend(((WriteBit.READ, cmd), f'{name} {label}', _decode_float, unit)
+                     for label, cmd, unit in _RAIL_READS)
+    if page != 0:
+        queue.append(((WriteBit.WRITE, CMD.PAGE, [0]), None, None, None))
+    return tuple(queue)
+
+
+_STATUS_QUEUE = _make_status_queue()
@@ -74,13 +74,15 @@ class SeasonicEDriver(UsbHidDriver):
 
     def _write(self, data):
         padding = [0x0]*(_WRITE_LENGTH - len(data))
-        LOGGER.debug('write %s (and %i padding bytes)',
-                     ' '.join(format(i, '02x') for i in data), len(padding))
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('write %s (and %i padding bytes)',
+                         ' '.join(format(i, '02x') for i in data), len(padding))
         self.device.write(data + padding)
 
     def _read(self):
         data = self.device.read(_READ_LENGTH)
-        LOGGER.debug('received %s', ' '.join(format(i, '02x') for i in data))
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('received %s', ' '.join(format(i, '02x') for i in data))
         return data
 
     def _wait(self):
@@ -47,6 +47,9 @@ HidapiBus
 PyUsbBus
 └── drivers: all (recursive) subclasses of UsbDriver
 
+Enumeration results from both buses are reused for ENUMERATION_TTL seconds;
+flush_enumeration_cache can be used to force a fresh enumeration.
+
 The subclass constructor can generally be kept unaware of the implementation
 details of the device parameter, and find_supported_devices already accepts
 keyword arguments and forwards them to the driver constructor.
@@ -59,6 +62,10 @@ SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
 import sys
+import time
+
+from contextlib import contextmanager
+from operator import attrgetter
 
 import usb
 try:
@@ -66,11 +73,49 @@ try:
 except ModuleNotFoundError:
     import hid
 
-from liquidctl.driver.base import BaseDriver, BaseBus, find_all_subclasses
+from liquidctl.driver.base import BaseDriver, BaseBus, find_sorted_subclasses
 
 
 LOGGER = logging.getLogger(__name__)
 
+# maps (vendor id, product id) to the drivers that list it in their
+# SUPPORTED_DEVICES, sorted by driver name
+_DRIVERS_BY_IDS = {}
+
+_DRIVER_NAME = attrgetter('__name__')
+
+# how long (in seconds) bus enumeration results are reused for
+ENUMERATION_TTL = 3.0
+
+# default for how long (in seconds) drivers reuse their status reports
+STATUS_TTL = 0.5
+
+# large enough to pad any full or high speed HID report
+_ZEROES = memoryview(bytes(1024))
+
+# maps each API to (monotonic timestamp, list of all devices it enumerated);
+# callers filter these by vendor and product ids themselves
+_ENUMERATION_CACHE = {}
+
+
+def flush_enumeration_cache():
+    """Forget cached bus enumeration results.
+
+    The next enumeration of each bus will query the system again.  This is
+    done automatically when opening a device fails.
+    """
+    _ENUMERATION_CACHE.clear()
+
+
+def _cached_enumeration(key, enumerator):
+    now = time.monotonic()
+    cached = _ENUMERATION_CACHE.get(key)
+    if cached and now - cached[0] < ENUMERATION_TTL:
+        return cached[1]
+    found = list(enumerator())
+    _ENUMERATION_CACHE[key] = (now, found)
+    return found
+
 
 class BaseUsbDriver(BaseDriver):
     """Base driver class for generic USB devices.
@@ -83,19 +128,38 @@ class BaseUsbDriver(BaseDriver):
 
     find_supported_devices will pass these extra kwargs, as well as any it
     receives, to the constructor.
+
+    Drivers are registered with the buses, by vendor and product id, when
+    their class is defined; SUPPORTED_DEVICES should not be changed afterwards.
     """
 
     SUPPORTED_DEVICES = []
 
+    # maps (vendor id, product id) to the matching (description, devargs)
+    # entries of SUPPORTED_DEVICES
+    _SUPPORTED_BY_IDS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SUPPORTED_BY_IDS = {}
+        for vid, pid, _, description, devargs in cls.SUPPORTED_DEVICES:
+            entries = cls._SUPPORTED_BY_IDS.setdefault((vid, pid), [])
+            entries.append((description, devargs))
+            drivers = _DRIVERS_BY_IDS.setdefault((vid, pid), [])
+            if cls not in drivers:
+                drivers.append(cls)
+                drivers.sort(key=_DRIVER_NAME)
+
     @classmethod
     def probe(cls, handle, vendor=None, product=None, release=None,
               serial=None, match=None, **kwargs):
         """Probe `handle` and yield corresponding driver instances."""
-        for vid, pid, _, description, devargs in cls.SUPPORTED_DEVICES:
-            if (vendor and vendor != vid) or handle.vendor_id != vid:
-                continue
-            if (product and product != pid) or handle.product_id != pid:
-                continue
+        if (vendor and vendor != handle.vendor_id) or (product and product != handle.product_id):
+            return
+        entries = cls._SUPPORTED_BY_IDS.get((handle.vendor_id, handle.product_id))
+        if not entries:
+            return
+        for description, devargs in entries:
             if release and handle.release_number != release:
                 continue
             if serial and handle.serial_number != serial:
@@ -175,10 +239,8 @@ class UsbHidDriver(BaseUsbDriver):
     def find_supported_devices(cls, **kwargs):
         """Find devices specifically compatible with this driver."""
         devs = []
-        for vid, pid, _, _, _ in cls.SUPPORTED_DEVICES:
-            for dev in HidapiBus().find_devices(vendor=vid, product=pid, **kwargs):
-                if type(dev) == cls:
-                    devs.append(dev)
+        for vid, pid in cls._SUPPORTED_BY_IDS:
+            devs.extend(HidapiBus().find_devices_for(cls, vendor=vid, product=pid, **kwargs))
         return devs
 
     def __init__(self, device, description, **kwargs):
@@ -195,6 +257,55 @@ class UsbHidDriver(BaseUsbDriver):
             device = HidapiDevice(hid, hidinfo)
         super().__init__(device, description, **kwargs)
 
+    def _init_status_cache(self, ttl=STATUS_TTL):
+        """Prepare to cache status reports for `ttl` seconds.
+
+        Drivers that call this can use `_cached_status` and `_cache_status` in
+        get_status; repeated calls within the TTL then do not query the device
+        again.  Any command that changes the device state should call
+        `_invalidate_status`.
+        """
+        self._status_ttl = ttl
+        self._status_cache = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def _cached_status(self):
+        """Return a copy of the cached status report, or None if expired."""
+        if self._status_cache:
+            timestamp, status = self._status_cache
+            if time.monotonic() - timestamp < self._status_ttl:
+                self._cache_hits += 1
+                return list(status)
+        self._cache_misses += 1
+        return None
+
+    def _cache_status(self, status):
+        """Cache `status` and return a copy of it."""
+        self._status_cache = (time.monotonic(), status)
+        return list(status)
+
+    def _invalidate_status(self):
+        self._status_cache = None
+
+    @contextmanager
+    def _session(self):
+        """Clear already enqueued reports on entry and release the device on exit.
+
+        Meant to wrap an entire sequence of requests and replies.
+        """
+        self.device.clear_enqueued_reports()
+        try:
+            yield
+        finally:
+            self.device.release()
+
+    @staticmethod
+    def _pad_with_zeroes(buf, start, stop=None):
+        """Zero `buf[start:stop]` in place, without allocating a new buffer."""
+        start, stop, _ = slice(start, stop).indices(len(buf))
+        buf[start:stop] = _ZEROES[:stop - start]
+
 
 class UsbDriver(BaseUsbDriver):
     """Base driver class for regular USB devices.
@@ -206,10 +317,8 @@ class UsbDriver(BaseUsbDriver):
     def find_supported_devices(cls, **kwargs):
         """Find devices specifically compatible with this driver."""
         devs = []
-        for vid, pid, _, _, _ in cls.SUPPORTED_DEVICES:
-            for dev in PyUsbBus().find_devices(vendor=vid, product=pid, **kwargs):
-                if type(dev) == cls:
-                    devs.append(dev)
+        for vid, pid in cls._SUPPORTED_BY_IDS:
+            devs.extend(PyUsbBus().find_devices_for(cls, vendor=vid, product=pid, **kwargs))
         return devs
 
 
@@ -224,6 +333,8 @@ class PyUsbDevice:
      - OpenUSB
     """
 
+    __slots__ = ('api', 'usbdev', 'bInterfaceNumber', '_attached', '_serial_number')
+
     def __init__(self, usbdev, bInterfaceNumber=None):
         self.api = usb
         self.usbdev = usbdev
@@ -240,19 +351,23 @@ class PyUsbDevice:
         selected interface, if necessary.
         """
         try:
-            cfg = self.usbdev.get_active_configuration()
+            try:
+                cfg = self.usbdev.get_active_configuration()
+            except usb.core.USBError:
+                LOGGER.debug('setting the (first) configuration')
+                self.usbdev.set_configuration()  # assume the first configuration
+                # FIXME device or handle might not be ready for use after set_configuration()
+                cfg = self.usbdev.get_active_configuration()
+            self.bInterfaceNumber = self._select_interface(cfg)
+            LOGGER.debug('selected interface: %d', self.bInterfaceNumber)
+            if (sys.platform.startswith('linux') and
+                    self.usbdev.is_kernel_driver_active(self.bInterfaceNumber)):
+                LOGGER.debug('replacing stock kernel driver with libusb')
+                self.usbdev.detach_kernel_driver(self.bInterfaceNumber)
+                self._attached = True
         except usb.core.USBError:
-            LOGGER.debug('setting the (first) configuration')
-            self.usbdev.set_configuration()  # assume the first configuration
-            # FIXME device or handle might not be ready for use after set_configuration()
-            cfg = self.usbdev.get_active_configuration()
-        self.bInterfaceNumber = self._select_interface(cfg)
-        LOGGER.debug('selected interface: %d', self.bInterfaceNumber)
-        if (sys.platform.startswith('linux') and
-                self.usbdev.is_kernel_driver_active(self.bInterfaceNumber)):
-            LOGGER.debug('replacing stock kernel driver with libusb')
-            self.usbdev.detach_kernel_driver(self.bInterfaceNumber)
-            self._attached = True
+            flush_enumeration_cache()  # the device might be gone
+            raise
 
     def claim(self):
         """Explicitly claim the device from other programs."""
@@ -293,12 +408,11 @@ class PyUsbDevice:
 
     @classmethod
     def enumerate(cls, vid=None, pid=None):
-        args = {}
-        if vid:
-            args['idVendor'] = vid
-        if pid:
-            args['idProduct'] = pid
-        for handle in usb.core.find(find_all=True, **args):
+        for handle in _cached_enumeration(usb, lambda: usb.core.find(find_all=True)):
+            if vid and handle.idVendor != vid:
+                continue
+            if pid and handle.idProduct != pid:
+                continue
             yield cls(handle)
 
     @property
@@ -315,7 +429,12 @@ class PyUsbDevice:
 
     @property
     def serial_number(self):
-        return self.usbdev.serial_number
+        # requires reading a string descriptor from the device, so only do it once
+        try:
+            return self._serial_number
+        except AttributeError:
+            self._serial_number = self.usbdev.serial_number
+            return self._serial_number
 
     @property
     def bus(self):
@@ -332,6 +451,9 @@ class PyUsbDevice:
     def __eq__(self, other):
         return type(self) == type(other) and self.bus == other.bus and self.address == other.address
 
+    def __hash__(self):
+        return hash((self.bus, self.address))
+
 
 class HidapiDevice:
     """A hidapi backed device.
@@ -355,6 +477,9 @@ class HidapiDevice:
 
         echo '<bus>-<port>:1.0' | sudo tee /sys/bus/usb/drivers/usbhid/bind
     """
+
+    __slots__ = ('api', 'hidinfo', 'hiddev')
+
     def __init__(self, hidapi, hidapi_dev_info):
         self.api = hidapi
         self.hidinfo = hidapi_dev_info
@@ -362,7 +487,11 @@ class HidapiDevice:
 
     def open(self):
         """Connect to the device."""
-        self.hiddev.open_path(self.hidinfo['path'])
+        try:
+            self.hiddev.open_path(self.hidinfo['path'])
+        except OSError:
+            flush_enumeration_cache()  # the device might be gone
+            raise
 
     def claim(self):
         """NOOP."""
@@ -417,7 +546,11 @@ class HidapiDevice:
 
     @classmethod
     def enumerate(cls, api, vid=None, pid=None):
-        infos = api.enumerate(vid or 0, pid or 0)
+        infos = _cached_enumeration(api, lambda: api.enumerate(0, 0))
+        if vid:
+            infos = (info for info in infos if info['vendor_id'] == vid)
+        if pid:
+            infos = (info for info in infos if info['product_id'] == pid)
         if sys.platform == 'darwin':
             infos = sorted(infos, key=lambda info: info['path'])
         for info in infos:
@@ -454,32 +587,41 @@ class HidapiDevice:
     def __eq__(self, other):
         return type(self) == type(other) and self.bus == other.bus and self.address == other.address
 
+    def __hash__(self):
+        return hash((self.bus, self.address))
+
 
 class HidapiBus(BaseBus):
-    def find_devices(self, vendor=None, product=None, bus=None, address=None, **kwargs):
-        """Find compatible USB HID devices."""
-        handles = HidapiDevice.enumerate(hid, vendor, product)
-        drivers = sorted(find_all_subclasses(UsbHidDriver), key=lambda x: x.__name__)
-        LOGGER.debug('searching %s (api=%s, drivers=[%s])', self.__class__.__name__, hid.__name__,
-                     ', '.join(map(lambda x: x.__name__, drivers)))
-        for handle in handles:
+    def _find_handles(self, vendor, product, bus, address):
+        for handle in HidapiDevice.enumerate(hid, vendor, product):
             if bus and handle.bus != bus:
                 continue
             if address and handle.address != address:
                 continue
+            yield handle
+
+    def find_devices(self, vendor=None, product=None, bus=None, address=None, **kwargs):
+        """Find compatible USB HID devices."""
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            drivers = find_sorted_subclasses(UsbHidDriver)
+            LOGGER.debug('searching %s (api=%s, drivers=[%s])', self.__class__.__name__,
+                         hid.__name__, ', '.join(map(_DRIVER_NAME, drivers)))
+        for handle in self._find_handles(vendor, product, bus, address):
             LOGGER.debug('probing drivers for device %04x:%04x', handle.vendor_id,
                          handle.product_id)
-            for drv in drivers:
-                yield from drv.probe(handle, vendor=vendor, product=product, **kwargs)
+            for drv in _DRIVERS_BY_IDS.get((handle.vendor_id, handle.product_id), []):
+                if issubclass(drv, UsbHidDriver):
+                    yield from drv.probe(handle, vendor=vendor, product=product, **kwargs)
+
+    def find_devices_for(self, driver, vendor=None, product=None, bus=None, address=None,
+                         **kwargs):
+        """Find USB HID devices compatible with `driver`."""
+        for handle in self._find_handles(vendor, product, bus, address):
+            yield from driver.probe(handle, vendor=vendor, product=product, **kwargs)
 
 
 class PyUsbBus(BaseBus):
-    def find_devices(self, vendor=None, product=None, bus=None, address=None,
-                     usb_port=None, **kwargs):
-        """ Find compatible regular USB devices."""
-        drivers = sorted(find_all_subclasses(UsbDriver), key=lambda x: x.__name__)
-        LOGGER.debug('searching %s (drivers=[%s])', self.__class__.__name__,
-                     ', '.join(map(lambda x: x.__name__, drivers)))
+    def _find_handles(self, vendor, product, bus, address, usb_port):
         for handle in PyUsbDevice.enumerate(vendor, product):
             if bus and handle.bus != bus:
                 continue
@@ -487,7 +629,24 @@ class PyUsbBus(BaseBus):
                 continue
             if usb_port and handle.port != usb_port:
                 continue
+            yield handle
+
+    def find_devices(self, vendor=None, product=None, bus=None, address=None,
+                     usb_port=None, **kwargs):
+        """ Find compatible regular USB devices."""
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            drivers = find_sorted_subclasses(UsbDriver)
+            LOGGER.debug('searching %s (drivers=[%s])', self.__class__.__name__,
+                         ', '.join(map(_DRIVER_NAME, drivers)))
+        for handle in self._find_handles(vendor, product, bus, address, usb_port):
             LOGGER.debug('probing drivers for device %04x:%04x', handle.vendor_id,
                          handle.product_id)
-            for drv in drivers:
-                yield from drv.probe(handle, vendor=vendor, product=product, **kwargs)
+            for drv in _DRIVERS_BY_IDS.get((handle.vendor_id, handle.product_id), []):
+                if issubclass(drv, UsbDriver):
+                    yield from drv.probe(handle, vendor=vendor, product=product, **kwargs)
+
+    def find_devices_for(self, driver, vendor=None, product=None, bus=None, address=None,
+                         usb_port=None, **kwargs):
+        """Find regular USB devices compatible with `driver`."""
+        for handle in self._find_handles(vendor, product, bus, address, usb_port):
+            yield from driver.probe(handle, vendor=vendor, product=product, **kwargs)
@@ -18,6 +18,11 @@ from ast import literal_eval
 LOGGER = logging.getLogger(__name__)
 XDG_RUNTIME_DIR = os.getenv('XDG_RUNTIME_DIR')
 
+# XDG_RUNTIME_DIR with a trailing separator, for containment checks
+_XDG_RUNTIME_PREFIX = None
+if XDG_RUNTIME_DIR:
+    _XDG_RUNTIME_PREFIX = os.path.join(os.path.normpath(XDG_RUNTIME_DIR), '')
+
 
 def get_runtime_dirs(appname='liquidctl'):
     """Return base directories for application runtime data.
@@ -62,8 +67,10 @@ class _FilesystemBackend:
         # dir is selected for writes and prefered for reads
         self._read_dirs = [os.path.join(x, *key_prefixes) for x in get_runtime_dirs()]
         self._write_dir = self._read_dirs[0]
+        self._write_paths = {}
         os.makedirs(self._write_dir, exist_ok=True)
-        if XDG_RUNTIME_DIR and os.path.commonpath([XDG_RUNTIME_DIR, self._write_dir]):
+        if (_XDG_RUNTIME_PREFIX and
+                os.path.normpath(self._write_dir).startswith(_XDG_RUNTIME_PREFIX)):
             # set the sticky bit to prevent removal during cleanup
             os.chmod(self._write_dir, 0o1700)
             LOGGER.debug('data in %s (within XDG_RUNTIME_DIR)', self._write_dir)
@@ -91,13 +98,16 @@ class _FilesystemBackend:
         return None
 
     def store(self, key, value):
-        data = repr(value)
+        data = ascii(value)
         assert literal_eval(data) == value, 'encode/decode roundtrip fails'
-        path = os.path.join(self._write_dir, key)
+        path = self._write_paths.get(key)
+        if path is None:
+            path = self._write_paths[key] = os.path.join(self._write_dir, key)
         fd, tmp = tempfile.mkstemp(dir=self._write_dir, text=True)
-        with open(fd, mode='w') as f:
-            f.write(data)
-            f.flush()
+        try:
+            os.write(fd, data.encode('ascii'))
+        finally:
+            os.close(fd)
         os.replace(tmp, path)
         LOGGER.debug('stored %s=%r (in %s)', key, value, path)
 
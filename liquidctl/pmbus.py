@@ -183,23 +183,15 @@ def compute_pec(bytes):
     >>> hex(compute_pec(bytes.fromhex('5c93')))
     '0x0'
     """
-    tbl = _gen_pec_table()
     reg = 0
     for octet in bytes:
-        idx = reg ^ octet
-        reg = tbl[idx]
+        reg = _PEC_TBL[reg ^ octet]
     return reg
 
 
 def _gen_pec_table():
-    """Generate the lookup table for compute_pec.
-
-    Once a table is generated it is reused for all subsequent calls.
-    """
-    global _PEC_TBL
-    if _PEC_TBL:
-        return _PEC_TBL
-    tbl = [0 for i in range(_PEC_TBL_LEN)]
+    """Generate the lookup table for compute_pec."""
+    tbl = bytearray(_PEC_TBL_LEN)
     for i in range(_PEC_TBL_LEN):
         reg = i
         for _ in range(8):
@@ -208,8 +200,7 @@ def _gen_pec_table():
             else:
                 reg = (reg << 1)
         tbl[i] = reg & _PEC_MASK
-    _PEC_TBL = tbl
-    return tbl
+    return bytes(tbl)
 
 
 _PEC_WIDTH = 8
@@ -217,4 +208,4 @@ _PEC_MSB_MASK = 1 << (_PEC_WIDTH - 1)
 _PEC_MASK = (_PEC_MSB_MASK << 1) - 1
 _PEC_POLY = (0b100000111 & _PEC_MASK)
 _PEC_TBL_LEN = 256
-_PEC_TBL = None
+_PEC_TBL = _gen_pec_table()
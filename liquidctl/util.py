@@ -6,14 +6,21 @@ Copyright (C) 2018–2020  each contribution's author
 SPDX-License-Identifier: GPL-3.0-or-later
 """
 
-import colorsys
 import logging
+import re
+import struct
 
-from ast import literal_eval
+from itertools import islice
 from enum import Enum, unique
 
 LOGGER = logging.getLogger(__name__)
 
+_U16LE = struct.Struct('<H')
+
+# integer percentages expressed as fractions of 255; computed exactly like
+# non-integer percentages, so that 30 and 30.0 both map to 76
+_PERCENTAGE_TO_BYTE = tuple(round(percentage / 100 * 255) for percentage in range(101))
+
 
 HUE2_MAX_ACCESSORIES_IN_CHANNEL = 6
 
@@ -27,14 +34,17 @@ class Hue2Accessory(Enum):
     >>> str(Hue2Accessory(4))
     'HUE 2 LED Strip 300 mm'
 
-    Unknown IDs are automatically translated to equivalent pseudo-names.
+    Unknown IDs are automatically translated to equivalent pseudo-names,
+    which are created only once for each ID.
 
     >>> Hue2Accessory(59)
     <Hue2Accessory.UNKNOWN_59: 59>
-    >>> Hue2Accessory(59).value == Hue2Accessory(59).value
+    >>> Hue2Accessory(59) is Hue2Accessory(59)
     True
     >>> Hue2Accessory(59) != Hue2Accessory(58)
     True
+    >>> len({Hue2Accessory(4), Hue2Accessory(59), Hue2Accessory(59)})
+    2
     """
 
     HUE_PLUS_LED_STRIP = (0x01, 'HUE+ LED Strip')
@@ -62,31 +72,45 @@ class Hue2Accessory(Enum):
         dummy.pretty_name = 'Unknown'
         dummy._name_ = f'UNKNOWN_{value}'
         dummy._value_ = value
+        # register the pseudo-member so that later lookups find it directly
+        cls._value2member_map_[value] = dummy
         return dummy
 
     def __str__(self):
         return self.pretty_name
 
-    def __eq__(self, other):
-        return self.value == other.value
-
 
 def clamp(value, clampmin, clampmax):
-    """Clamp numeric `value` to interval [`clampmin`, `clampmax`]."""
-    clamped = max(clampmin, min(clampmax, value))
-    if clamped != value:
-        LOGGER.debug('clamped %s to interval [%s, %s]', value, clampmin, clampmax)
-    return clamped
+    """Clamp numeric `value` to interval [`clampmin`, `clampmax`].
+
+    >>> clamp(42, 0, 100)
+    42
+    >>> clamp(-1, 0, 100), clamp(101, 0, 100)
+    (0, 100)
+    """
+    if clampmin <= value <= clampmax:
+        return value
+    LOGGER.debug('clamped %s to interval [%s, %s]', value, clampmin, clampmax)
+    return clampmin if value < clampmin else clampmax
 
 
 def fraction_of_byte(ratio=None, percentage=None):
     """Return `ratio` xor `percentage` expressed as a fraction of 255.
 
+    Integer percentages are converted with a lookup table, but round the same
+    way as ratios and non-integer percentages.
+
     >>> fraction_of_byte(ratio=.8)
     204
     >>> fraction_of_byte(percentage=20)
     51
+    >>> fraction_of_byte(percentage=30), fraction_of_byte(percentage=30.0), fraction_of_byte(ratio=.3)
+    (76, 76, 76)
     """
+    if isinstance(percentage, int):
+        if percentage < 0 or percentage > 100:
+            raise ValueError('Cannot express ratios outside of [0, 1]')
+        return _PERCENTAGE_TO_BYTE[percentage]
     if percentage is not None:
         ratio = percentage / 100
     if ratio is not None:
@@ -97,20 +121,19 @@ def fraction_of_byte(ratio=None, percentage=None):
 
 
 def u16le_from(buffer, offset=0):
-    """Read an unsigned 16-bit little-endian integer from `buffer`.
+    """Read an unsigned 16-bit little-endian integer from bytes-like `buffer`.
 
     >>> u16le_from(b'\x45\x05\x03')
     1349
     >>> u16le_from(b'\x45\x05\x03', offset=1)
     773
     """
-    return int.from_bytes(buffer[offset : offset + 2], byteorder='little')
+    return _U16LE.unpack_from(buffer, offset)[0]
 
 
 def delta(profile):
     """Compute a profile's Δx and Δy."""
-    return [(cur[0]-prev[0], cur[1]-prev[1])
-            for cur,prev in zip(profile[1:], profile[:-1])]
+    return [(x - xb, y - yb) for (xb, yb), (x, y) in zip(profile, islice(profile, 1, None))]
 
 
 def normalize_profile(profile, critx):
@@ -132,17 +155,27 @@ def normalize_profile(profile, critx):
     [(25, 25), (30, 40), (35, 100)]
     >>> normalize_profile([], 60)
     [(60, 100)]
+    >>> normalize_profile([(30, 40), (35, 30), (40, 35)], 60)
+    [(30, 40), (35, 40), (40, 40), (60, 100)]
+    >>> normalize_profile([(68, 56)], 60)
+    [(60, 100)]
     """
-    profile = sorted(list(profile) + [(critx, 100)], key=lambda p: (p[0], -p[1]))
-    mono = profile[0:1]
-    for (x, y), (xb, yb) in zip(profile[1:], profile[:-1]):
+    # sort by x, and then by *decreasing* y
+    points = [(x, -y) for x, y in profile]
+    points.append((critx, -100))
+    points.sort()
+    mono = []
+    xb, yb = None, None
+    for x, y in points:
         if x == xb:
             continue
-        if y < yb:
+        y = -y
+        if yb is not None and y < yb:
             y = yb
         mono.append((x, y))
         if y == 100:
             break
+        xb, yb = x, y
     return mono
 
 
@@ -161,6 +194,8 @@ def interpolate_profile(profile, x):
     70
     >>> interpolate_profile([(20, 50)], 20)
     50
+    >>> interpolate_profile([(20, 50), (50, 70), (60, 100)], 50)
+    70
     """
     lower, upper = profile[0], profile[-1]
     for step in profile:
@@ -174,6 +209,74 @@ def interpolate_profile(profile, x):
     return round(lower[1] + (x - lower[0])/(upper[0] - lower[0])*(upper[1] - lower[1]))
 
 
+# component order for each sector of the HSV hexcone, indexing (v, p, q, t)
+_HSV_SECTORS = ((0, 3, 1), (2, 0, 1), (1, 0, 3), (1, 2, 0), (3, 1, 0), (0, 1, 2))
+
+
+def _hsv_to_rgb(h, s, v):
+    """Convert H ∊ [0, 360], SV ∊ [0, 100] to RGB bytes.
+
+    Same math as colorsys.hsv_to_rgb, but with the sector picked by lookup.
+
+    >>> _hsv_to_rgb(20, 75, 100)
+    [255, 128, 64]
+    """
+    h, s, v = h / 360, s / 100, v / 100
+    i = int(h * 6.0)
+    f = (h * 6.0) - i
+    comps = (v, v * (1.0 - s), v * (1.0 - s * f), v * (1.0 - s * (1.0 - f)))
+    return [round(comps[c] * 255) for c in _HSV_SECTORS[i % 6]]
+
+
+def _hue_to_component(m1, m2, hue):
+    hue = hue % 1.0
+    if hue < 1/6:
+        return m1 + (m2 - m1) * hue * 6.0
+    if hue < 0.5:
+        return m2
+    if hue < 2/3:
+        return m1 + (m2 - m1) * (2/3 - hue) * 6.0
+    return m1
+
+
+def _hsl_to_rgb(h, s, l):
+    """Convert H ∊ [0, 360], SL ∊ [0, 100] to RGB bytes.
+
+    Same math as colorsys.hls_to_rgb.
+
+    >>> _hsl_to_rgb(20, 100, 62)
+    [255, 126, 61]
+    """
+    h, s, l = h / 360, s / 100, l / 100
+    m2 = l * (1.0 + s) if l <= 0.5 else l + s - (l * s)
+    m1 = 2.0 * l - m2
+    return [round(_hue_to_component(m1, m2, hue) * 255) for hue in (h + 1/3, h, h - 1/3)]
+
+
+# a parenthesized triple of int or float literals, optionally with a trailing
+# comma; like in Python, decimal integers cannot have leading zeros
+_NUMBER = (r'\s*([-+]?(?:0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[bB][01]+'
+           r'|(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+'
+           r'|0+|[1-9]\d*))\s*')
+_TRIPLE = re.compile(r'\s*\(' + ','.join([_NUMBER] * 3) + r',?\s*\)\s*')
+
+
+def _parse_number(literal):
+    lowered = literal.lower()
+    if '.' in lowered or ('e' in lowered and 'x' not in lowered):
+        return float(literal)
+    return int(literal, 0)
+
+
+# maps (lowercase) color function prefixes to the maximum values of each
+# argument and a function that converts them to RGB
+_COLOR_MODELS = {
+    'rgb(': ((255, 255, 255), lambda r, g, b: [r, g, b]),
+    'hsv(': ((360, 100, 100), _hsv_to_rgb),
+    'hsl(': ((360, 100, 100), _hsl_to_rgb),
+}
+
+
 def color_from_str(x):
     """Parse a color, and, if necessary, translate it into the RGB model.
 
@@ -197,6 +300,10 @@ def color_from_str(x):
     Traceback (most recent call last):
         ...
     ValueError: Cannot parse color: fF7f3f1f
+    >>> color_from_str('ff  ff')
+    Traceback (most recent call last):
+        ...
+    ValueError: Cannot parse color: ff  ff
     >>> color_from_str('rgb()')
     Traceback (most recent call last):
         ...
@@ -205,6 +312,14 @@ def color_from_str(x):
     Traceback (most recent call last):
         ...
     ValueError: Expected 3-element triple: rgb(255)
+    >>> color_from_str('rgb(a, b, c)')
+    Traceback (most recent call last):
+        ...
+    ValueError: Expected 3-element triple: rgb(a, b, c)
+    >>> color_from_str('rgb(010, 1, 1)')
+    Traceback (most recent call last):
+        ...
+    ValueError: Expected 3-element triple: rgb(010, 1, 1)
     >>> color_from_str('rgb(300, 255, 255)')
     Traceback (most recent call last):
         ...
@@ -220,26 +335,21 @@ def color_from_str(x):
     """
 
     def parse_triple(sub, maxvalues):
-        literal = literal_eval(sub)
-        if not isinstance(literal, tuple) or len(literal) != 3:
+        match = _TRIPLE.fullmatch(sub)
+        if not match:
             raise ValueError(f'Expected 3-element triple: {x}')
+        literal = tuple(map(_parse_number, match.groups()))
         for value, maxvalue in zip(literal, maxvalues):
-            if not isinstance(value, int) and not isinstance(value, float):
-                raise ValueError(f'Expected float or int: {value} in {x}')
             if value < 0 or value > maxvalue:
                 raise ValueError(f'Expected value in range [0, {maxvalue}]: {value} in {x}')
         return literal
 
-    if x.lower().startswith('rgb('):
-        r, g, b = parse_triple(x[3:], (255, 255, 255))
-        return [r, g, b]
-    elif x.lower().startswith('hsv('):
-        h, s, v = parse_triple(x[3:], (360, 100, 100))
-        return list(map(lambda b: round(b*255), colorsys.hsv_to_rgb(h/360, s/100, v/100)))
-    elif x.lower().startswith('hsl('):
-        h, s, l = parse_triple(x[3:], (360, 100, 100))
-        return list(map(lambda b: round(b*255), colorsys.hls_to_rgb(h/360, l/100, s/100)))
-    elif len(x) == 6:
-        return list(bytes.fromhex(x))
-    else:
-        raise ValueError(f'Cannot parse color: {x}')
+    model = _COLOR_MODELS.get(x[:4].lower())
+    if model:
+        maxvalues, to_rgb = model
+        return to_rgb(*parse_triple(x[3:], maxvalues))
+    if len(x) == 6:
+        rgb = bytes.fromhex(x)  # faster than int(x, 16) and bit twiddling
+        if len(rgb) == 3:
+            return list(rgb)
+    raise ValueError(f'Cannot parse color: {x}')
@@ -0,0 +1,94 @@
+from _testutils import *
+
+import unittest
+
+from datetime import timedelta
+
+from liquidctl.driver.corsair_hid_psu import CorsairHidPsuDriver, OCPMode, FanControlMode
+from liquidctl.pmbus import CommandCode as CMD
+from liquidctl.pmbus import float_to_linear11
+
+
+class _MockPsuDevice(MockHidapiDevice):
+    def __init__(self, vendor_id=0x1b1c, product_id=0x1c05, address='addr'):
+        super().__init__(vendor_id=vendor_id, product_id=product_id, address=address)
+        self.page = 0
+        self.values = {
+            (0, 0xd2): (3600).to_bytes(4, byteorder='little'),
+            (0, 0xd1): (86400).to_bytes(4, byteorder='little'),
+            (0, CMD.READ_TEMPERATURE_1): float_to_linear11(40.5),
+            (0, CMD.READ_TEMPERATURE_2): float_to_linear11(35.25),
+            (0, 0xf0): bytes([FanControlMode.HARDWARE.value]),
+            (0, CMD.READ_FAN_SPEED_1): float_to_linear11(512),
+            (0, CMD.READ_VIN): float_to_linear11(230),
+            (0, 0xee): float_to_linear11(300),
+            (0, 0xd8): bytes([OCPMode.MULTI_RAIL.value]),
+        }
+        for rail, vout in enumerate([12.0, 5.0, 3.25]):
+            self.values[(rail, CMD.READ_VOUT)] = float_to_linear11(vout)
+            self.values[(rail, CMD.READ_IOUT)] = float_to_linear11(rail + 1)
+            self.values[(rail, CMD.READ_POUT)] = float_to_linear11(vout * (rail + 1))
+        self.reads = []
+
+    def write(self, data):
+        super().write(data)
+        data = bytes(data)
+        address, command = data[0], data[1]
+        if address & 0x1:
+            self.reads.append((self.page, command))
+            value = self.values.get((self.page, command), b'')
+        else:
+            if command == CMD.PAGE:
+                self.page = data[2]
+            value = b''
+        self.preload_read(Report(0, [address, command] + list(value)))
+        return len(data)
+
+
+class CorsairHidPsuTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_hid = _MockPsuDevice()
+        self.device = CorsairHidPsuDriver(self.mock_hid, 'Mock Corsair HX750i')
+        self.device.connect()
+
+    def tearDown(self):
+        self.device.disconnect()
+
+    def test_get_status(self):
+        status = {k: (v, u) for k, v, u in self.device.get_status()}
+        self.assertEqual(status['Current uptime'], (timedelta(hours=1), ''))
+        self.assertEqual(status['Total uptime'], (timedelta(days=1), ''))
+        self.assertEqual(status['Temperature 1'], (40.5, '°C'))
+        self.assertEqual(status['Fan control mode'], (FanControlMode.HARDWARE, ''))
+        self.assertEqual(status['Fan speed'], (512, 'rpm'))
+        self.assertEqual(status['+12V OCP mode'], (OCPMode.MULTI_RAIL, ''))
+        self.assertEqual(status['+12V output voltage'], (12, 'V'))
+        self.assertEqual(status['+5V output current'], (2, 'A'))
+        self.assertAlmostEqual(status['+3.3V output voltage'][0], 3.25, places=2)
+        self.assertAlmostEqual(status['+3.3V output power'][0], 9.75, places=1)
+
+    def test_get_status_reads_each_rail_on_its_page(self):
+        self.device.get_status()
+        for rail in range(3):
+            for cmd in [CMD.READ_VOUT, CMD.READ_IOUT, CMD.READ_POUT]:
+                self.assertIn((rail, cmd), self.mock_hid.reads)
+        self.assertEqual(self.mock_hid.page, 0)
+        pages = [data[1] for address, data in self.mock_hid.sent
+                 if not address & 0x1 and data[0] == CMD.PAGE]
+        self.assertEqual(pages, [0, 1, 2, 0])
+
+    def test_cached_status(self):
+        first = self.device.get_status()
+        sent = len(self.mock_hid.sent)
+        self.assertEqual(self.device.get_status(), first)
+        self.assertEqual(len(self.mock_hid.sent), sent)
+        self.device.set_fixed_speed(channel='fan', duty=50)
+        self.device.get_status()
+        self.assertGreater(len(self.mock_hid.sent), sent + 2)
+
+    def test_get_status_order(self):
+        labels = [k for k, _, _ in self.device.get_status()]
+        self.assertEqual(labels[:3], ['Current uptime', 'Total uptime', 'Temperature 1'])
+        self.assertEqual(labels[-3:], ['+3.3V output voltage', '+3.3V output current',
+                                       '+3.3V output power'])
+        self.assertEqual(len(labels), 18)
@@ -27,14 +27,14 @@ class _MockPlatinumHid(MockHidapiDevice):
         buf[15:17] = self.fan1_speed.to_bytes(length=2, byteorder='little')
         buf[22:24] = self.fan2_speed.to_bytes(length=2, byteorder='little')
         buf[29:31] = self.pump_speed.to_bytes(length=2, byteorder='little')
-        buf[-1] = compute_pec(buf[1:-1])
+        buf[-1] = compute_pec(memoryview(buf)[1:-1])
         return buf[:length]
 
 
 class CorsairPlatinumTestCase(unittest.TestCase):
     def setUp(self):
         description = 'Mock H115i Platinum'
-        kwargs = {'fan_count': 2, 'rgb_fans': True}
+        kwargs = {'fan_count': 2, 'rgb_fans': True, 'status_ttl': 0}
         self.mock_hid = _MockPlatinumHid(product_id=0x0c15)
         self.device = CoolitPlatinumDriver(self.mock_hid, description, **kwargs)
         self.device.connect()
@@ -57,6 +57,15 @@ class CorsairPlatinumTestCase(unittest.TestCase):
             self.assertEqual(data[1] >> 3, i + 1)
             self.assertEqual(data[-1], compute_pec(data[1:-1]))
 
+    def test_sequence_persisted_on_disconnect(self):
+        self.device._data.store('sequence', 30)
+        self.device.get_status()
+        self.device.get_status()
+        self.assertEqual(self.device._data.load('sequence'), 30)
+        self.device.disconnect()
+        self.assertEqual(self.device._data.load('sequence'), 1)
+        self.assertEqual([data[1] >> 3 for _, data in self.mock_hid.sent], [31, 1])
+
     def test_get_status(self):
         temp, pump, fan1, fan2 = self.device.get_status()
         self.assertAlmostEqual(temp[1], self.mock_hid.temperature, delta=1 / 255)
@@ -84,6 +93,17 @@ class CorsairPlatinumTestCase(unittest.TestCase):
             self.assertNotEqual(status[0][1], self.mock_hid.temperature,
                                 msg='failed sanity check')
 
+    def test_cached_status(self):
+        self.device._status_ttl = 60
+        first = self.device.get_status()
+        self.assertEqual(self.device.get_status(), first)
+        self.assertEqual(len(self.mock_hid.sent), 1)
+        self.assertEqual(self.device._cache_hits, 1)
+        self.device.set_fixed_speed(channel='fan', duty=42)
+        self.device.get_status()
+        self.assertEqual(len(self.mock_hid.sent), 3)
+        self.assertEqual(self.device._cache_misses, 2)
+
     def test_initialize_status(self):
         (fw_version, ) = self.device.initialize()
         self.assertEqual(fw_version[1], '%d.%d.%d' % self.mock_hid.fw_version)
@@ -113,6 +133,16 @@ class CorsairPlatinumTestCase(unittest.TestCase):
         self.assertAlmostEqual(self.mock_hid.sent[-1].data[0x16] / 2.55, 42, delta=1 / 2.55)
         self.assertRaises(Exception, self.device.set_fixed_speed, channel='invalid', duty=0)
 
+    def test_non_blocking_fan_speeds(self):
+        self.device.set_fixed_speed(channel='fan', duty=42, blocking=False)
+        self.device.set_fixed_speed(channel='fan1', duty=84, blocking=False)
+        self.device.flush()
+        self.assertEqual(len(self.mock_hid.sent), 2)
+        self.assertAlmostEqual(self.mock_hid.sent[0].data[0x10] / 2.55, 42, delta=1 / 2.55)
+        self.assertAlmostEqual(self.mock_hid.sent[1].data[0x10] / 2.55, 84, delta=1 / 2.55)
+        self.device.get_status()
+        self.assertEqual(self.mock_hid.sent[-1].data[2], 0xff)
+
     def test_custom_fan_profiles(self):
         self.device.set_speed_profile(channel='fan', profile=iter([(20, 0), (55, 100)]))
         self.device.set_speed_profile(channel='fan1', profile=iter([(30, 20), (50, 80)]))
@@ -128,6 +158,12 @@ class CorsairPlatinumTestCase(unittest.TestCase):
         self.assertRaises(ValueError, self.device.set_speed_profile,
                           channel='fan', profile=zip(range(10), range(10)))
 
+    def test_profile_encoding_ignores_duty_type(self):
+        self.device.set_speed_profile(channel='fan1', profile=[(20, 30), (50, 70)])
+        self.assertEqual(self.mock_hid.sent[-1].data[0x1e:0x22], [20, 76, 50, 178])
+        self.device.set_speed_profile(channel='fan1', profile=[(20, 30.0), (50, 70.0)])
+        self.assertEqual(self.mock_hid.sent[-1].data[0x1e:0x22], [20, 76, 50, 178])
+
     def test_address_leds(self):
         colors = [[i + 3, i + 2, i + 1] for i in range(0, 24 * 3, 3)]
         encoded = list(range(1, 24 * 3 + 1))
@@ -155,6 +191,14 @@ class CorsairPlatinumTestCase(unittest.TestCase):
         self.assertEqual(self.mock_hid.sent[1].data[1] & 0b111, 0b101)
         self.assertEqual(self.mock_hid.sent[1].data[2:14], encoded[60:])
 
+    def test_address_component_leds_with_padding(self):
+        colors = [[3, 2, 1], [6, 5, 4]]
+        encoded = ([1, 2, 3, 4, 5, 6] + [0] * 18) * self.device._component_count
+        encoded += [0] * (24 * 3 - len(encoded))
+        self.device.set_color(channel='sync', mode='super-fixed', colors=iter(colors))
+        self.assertEqual(self.mock_hid.sent[0].data[2:62], encoded[:60])
+        self.assertEqual(self.mock_hid.sent[1].data[2:14], encoded[60:])
+
     def test_leds_off(self):
         self.device.set_color(channel='led', mode='off', colors=iter([]))
         self.device.set_color(channel='sync', mode='off', colors=iter([]))
@@ -180,7 +224,7 @@ class CorsairPlatinumTestCase(unittest.TestCase):
 class H150iProXtTestCase(CorsairPlatinumTestCase):
     def setUp(self):
         description = 'Mock H150i PRO XT'
-        kwargs = {'fan_count': 1, 'rgb_fans': False}
+        kwargs = {'fan_count': 1, 'rgb_fans': False, 'status_ttl': 0}
         self.mock_hid = _MockPlatinumHid(product_id=0x0c22)
         self.mock_hid.fan2_speed = 0
         self.device = CoolitPlatinumDriver(self.mock_hid, description, **kwargs)
@@ -0,0 +1,29 @@
+from _testutils import *
+
+import unittest
+
+from unittest import mock
+
+from liquidctl.driver import find_liquidctl_devices
+
+
+class _MockBus:
+    def find_devices(self, **kwargs):
+        return iter(['a', 'b', 'c'])
+
+
+class FindLiquidctlDevicesTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('liquidctl.driver.find_sorted_subclasses', lambda cls: [_MockBus])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_yields_all_devices(self):
+        self.assertEqual(list(find_liquidctl_devices()), ['a', 'b', 'c'])
+
+    def test_pick(self):
+        self.assertEqual(list(find_liquidctl_devices(pick=1)), ['b'])
+        self.assertEqual(list(find_liquidctl_devices(pick=3)), [])
+
+    def test_negative_pick(self):
+        self.assertEqual(list(find_liquidctl_devices(pick=-1)), [])
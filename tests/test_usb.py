@@ -0,0 +1,159 @@
+from _testutils import *
+
+import gc
+import unittest
+
+from unittest import mock
+
+from liquidctl.driver.base import find_sorted_subclasses
+from liquidctl.driver.usb import HidapiBus, HidapiDevice, PyUsbDevice, UsbDriver, \
+    UsbHidDriver, flush_enumeration_cache
+
+
+class _MockDriver(UsbHidDriver):
+    SUPPORTED_DEVICES = [
+        (0xffff, 0x1234, None, 'Mock device A', {}),
+        (0xffff, 0x1235, None, 'Mock device B', {}),
+    ]
+
+
+class _OtherMockDriver(UsbHidDriver):
+    SUPPORTED_DEVICES = [
+        (0xffff, 0x1235, None, 'Other mock device B', {}),
+    ]
+
+
+class _MockUsbDriver(UsbDriver):
+    SUPPORTED_DEVICES = [
+        (0xffff, 0x1236, None, 'Mock USB device', {}),
+    ]
+
+
+def _mock_enumerate(*handles):
+    return mock.patch.object(HidapiDevice, 'enumerate', lambda api, vid, pid: iter(handles))
+
+
+class HidapiBusTestCase(unittest.TestCase):
+    def setUp(self):
+        self.a = MockHidapiDevice(vendor_id=0xffff, product_id=0x1234, address='a')
+        self.b = MockHidapiDevice(vendor_id=0xffff, product_id=0x1235, address='b')
+        self.unknown = MockHidapiDevice(vendor_id=0xffff, product_id=0x9999, address='c')
+
+    def test_dispatches_by_ids(self):
+        with _mock_enumerate(self.a, self.unknown, self.b):
+            devs = list(HidapiBus().find_devices())
+        self.assertEqual([(type(dev), dev.device) for dev in devs], [
+            (_MockDriver, self.a),
+            (_MockDriver, self.b),
+            (_OtherMockDriver, self.b),
+        ])
+
+    def test_filters_by_match(self):
+        with _mock_enumerate(self.a, self.unknown, self.b):
+            devs = list(HidapiBus().find_devices(match='other'))
+        self.assertEqual([dev.description for dev in devs], ['Other mock device B'])
+
+    def test_probe_by_ids(self):
+        self.assertEqual([dev.description for dev in _MockDriver.probe(self.b)],
+                         ['Mock device B'])
+        self.assertEqual(list(_MockDriver.probe(self.unknown)), [])
+        self.assertEqual(list(_MockDriver.probe(self.b, product=0x1234)), [])
+
+    def test_sorted_drivers_include_new_drivers(self):
+        self.assertIn(_MockDriver, find_sorted_subclasses(UsbHidDriver))
+
+        class _LateMockDriver(UsbHidDriver):
+            pass
+
+        self.assertIn(_LateMockDriver, find_sorted_subclasses(UsbHidDriver))
+
+        # unregister the late driver so that it does not leak into other tests
+        del _LateMockDriver
+        find_sorted_subclasses.cache_clear()
+        gc.collect()
+        self.assertNotIn('_LateMockDriver',
+                         [cls.__name__ for cls in find_sorted_subclasses(UsbHidDriver)])
+
+    def test_find_supported_devices(self):
+        with _mock_enumerate(self.a, self.b):
+            devs = _OtherMockDriver.find_supported_devices()
+        self.assertEqual([(type(dev), dev.device) for dev in devs], [(_OtherMockDriver, self.b)])
+
+    def test_find_supported_devices_only_probes_driver(self):
+        with _mock_enumerate(self.a, self.b), \
+                mock.patch.object(_OtherMockDriver, 'probe') as other_probe:
+            devs = _MockDriver.find_supported_devices()
+        self.assertEqual([dev.description for dev in devs], ['Mock device A', 'Mock device B'])
+        other_probe.assert_not_called()
+
+
+class _MockHidapi:
+    def __init__(self, *infos):
+        self.infos = infos
+        self.enumerations = 0
+
+    def enumerate(self, vid, pid):
+        self.enumerations += 1
+        return [info for info in self.infos
+                if vid in (0, info['vendor_id']) and pid in (0, info['product_id'])]
+
+    def device(self):
+        return mock.Mock(open_path=mock.Mock(side_effect=OSError('open failed')))
+
+
+class HidapiEnumerationTestCase(unittest.TestCase):
+    def setUp(self):
+        flush_enumeration_cache()
+        info = {'vendor_id': 0xffff, 'product_id': 0x1234, 'path': b'a'}
+        self.api = _MockHidapi(info)
+
+    def tearDown(self):
+        flush_enumeration_cache()
+
+    def test_reuses_recent_enumeration(self):
+        first = list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))
+        second = list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))
+        self.assertEqual(self.api.enumerations, 1)
+        self.assertEqual(first, second)
+        self.assertIsNot(first[0], second[0])
+
+    def test_filters_cached_enumeration(self):
+        self.assertEqual(len(list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))), 1)
+        self.assertEqual(len(list(HidapiDevice.enumerate(self.api, 0xffff, 0x1235))), 0)
+        self.assertEqual(len(list(HidapiDevice.enumerate(self.api))), 1)
+        self.assertEqual(self.api.enumerations, 1)
+
+    def test_expired_enumeration(self):
+        list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))
+        with mock.patch('liquidctl.driver.usb.ENUMERATION_TTL', 0):
+            list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))
+        self.assertEqual(self.api.enumerations, 2)
+
+    def test_failed_open_flushes_cache(self):
+        handle, = HidapiDevice.enumerate(self.api, 0xffff, 0x1234)
+        self.assertRaises(OSError, handle.open)
+        list(HidapiDevice.enumerate(self.api, 0xffff, 0x1234))
+        self.assertEqual(self.api.enumerations, 2)
+
+
+class PyUsbDeviceTestCase(unittest.TestCase):
+    def test_identity_read_once(self):
+        usbdev = mock.Mock(idVendor=0xffff, idProduct=0x1234, bus=1, address=2)
+        serial = mock.PropertyMock(return_value='1234')
+        type(usbdev).serial_number = serial
+        handle = PyUsbDevice(usbdev)
+        self.assertEqual([handle.serial_number, handle.serial_number], ['1234', '1234'])
+        self.assertEqual(serial.call_count, 1)
+        self.assertEqual(handle.bus, 'usb1')
+        self.assertEqual(handle, PyUsbDevice(usbdev))
+        self.assertEqual(hash(handle), hash(PyUsbDevice(usbdev)))
+
+    def test_probe_only_reads_filtered_properties(self):
+        usbdev = mock.Mock(idVendor=0xffff, idProduct=0x1236)
+        serial = mock.PropertyMock(return_value='1234')
+        type(usbdev).serial_number = serial
+        handle = PyUsbDevice(usbdev)
+        self.assertEqual(len(list(_MockUsbDriver.probe(handle))), 1)
+        serial.assert_not_called()
+        self.assertEqual(len(list(_MockUsbDriver.probe(handle, serial='4321'))), 0)
+        serial.assert_called_once_with()